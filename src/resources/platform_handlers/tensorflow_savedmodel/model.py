@@ -28,6 +28,7 @@ import json
 import os
 
 try:
+    import numpy as np
     import tensorflow as tf
     from tensorflow.core.framework import types_pb2
     from tensorflow.python.client import session
@@ -77,34 +78,6 @@ def _get_savedmodel_path(config):
     return savedmodel_path
 
 
-def _parse_signature_def(config):
-    if config["parameters"]:
-        if "TF_SIGNATURE_DEF" in config["parameters"].keys():
-            return config["parameters"]["TF_SIGNATURE_DEF"]["string_value"]
-    return None
-
-
-def _parse_graph_tag(config):
-    if config["parameters"]:
-        if "TF_GRAPH_TAG" in config["parameters"].keys():
-            return config["parameters"]["TF_GRAPH_TAG"]["string_value"]
-    return None
-
-
-def _parse_num_intra_threads(config):
-    if config["parameters"]:
-        if "TF_NUM_INTRA_THREADS" in config["parameters"].keys():
-            return int(config["parameters"]["TF_NUM_INTRA_THREADS"]["string_value"])
-    return None
-
-
-def _parse_num_inter_threads(config):
-    if config["parameters"]:
-        if "TF_NUM_INTER_THREADS" in config["parameters"].keys():
-            return int(config["parameters"]["TF_NUM_INTER_THREADS"]["string_value"])
-    return None
-
-
 def _get_truth_value(string_value):
     val = string_value.casefold()
     if val == "yes" or val == "1" or val == "on" or val == "true":
@@ -113,17 +86,23 @@ def _get_truth_value(string_value):
         return False
 
 
-def _parse_use_per_session_thread(config):
-    if config["parameters"]:
-        if "USE_PER_SESSION_THREAD" in config["parameters"].keys():
-            val = config["parameters"]["USE_PER_SESSION_THREAD"]["string_value"]
-            return _get_truth_value(val)
-    return False
+def _get_parameter(config, name, default=None, cast=str):
+    parameters = config["parameters"]
+    if not parameters or name not in parameters:
+        return default
+
+    string_value = parameters[name]["string_value"]
+    try:
+        return cast(string_value)
+    except ValueError as error:
+        raise pb_utils.TritonModelException(
+            f"Invalid value '" + string_value + "' for parameter '" + name + "'"
+        ) from error
 
 
 def _get_signature_def(savedmodel_path, config):
     tag_sets = saved_model_utils.get_saved_model_tag_sets(savedmodel_path)
-    graph_tag = _parse_graph_tag(config)
+    graph_tag = _get_parameter(config, "TF_GRAPH_TAG")
     if graph_tag is None:
         if "serve" in tag_sets[0]:
             graph_tag = "serve"
@@ -132,7 +111,7 @@ def _get_signature_def(savedmodel_path, config):
 
     meta_graph_def = saved_model_utils.get_meta_graph_def(savedmodel_path, graph_tag)
     signature_def_map = meta_graph_def.signature_def
-    signature_def_k = _parse_signature_def(config)
+    signature_def_k = _get_parameter(config, "TF_SIGNATURE_DEF")
     if signature_def_k is None:
         serving_default = signature_constants.DEFAULT_SERVING_SIGNATURE_DEF_KEY
         if serving_default in signature_def_map.keys():
@@ -448,24 +427,41 @@ class TritonPythonModel:
         _validate_model_config(model_config, signature_def)
 
         self.signature_def = signature_def
-        self.input_tensor_info = self.signature_def.inputs
+        input_tensor_info = self.signature_def.inputs
         output_tensor_info = self.signature_def.outputs
 
+        # Requests can only be stacked into a single batch when the
+        # dynamic batcher guarantees matching shapes across them.
+        self.batching_enabled = model_config["max_batch_size"] != 0 and not any(
+            input.get("allow_ragged_batch", False) for input in model_config["input"]
+        )
+
         # Get the input output names from model config
         self.input_names = [input["name"] for input in model_config["input"]]
         self.output_names = [output["name"] for output in model_config["output"]]
 
-        # Get the output tensor names
+        # Get the input and output tensor names, resolved once here so that
+        # execute does not look them up in the signature for every request
+        self.input_tensor_names = [
+            input_tensor_info[input_name].name for input_name in self.input_names
+        ]
         self.output_tensor_names = [
             output_tensor_info[output_name].name for output_name in self.output_names
         ]
+        self.feed_names = list(zip(self.input_names, self.input_tensor_names))
 
         # load the session model
         # FIXME Add more configuration options for the model.
         sess_config = tf.compat.v1.ConfigProto(
-            inter_op_parallelism_threads=_parse_num_inter_threads(model_config),
-            intra_op_parallelism_threads=_parse_num_intra_threads(model_config),
-            use_per_session_threads=_parse_use_per_session_thread(model_config),
+            inter_op_parallelism_threads=_get_parameter(
+                model_config, "TF_NUM_INTER_THREADS", cast=int
+            ),
+            intra_op_parallelism_threads=_get_parameter(
+                model_config, "TF_NUM_INTRA_THREADS", cast=int
+            ),
+            use_per_session_threads=_get_parameter(
+                model_config, "USE_PER_SESSION_THREAD", False, _get_truth_value
+            ),
         )
         self.tf_session = session.Session(graph=tf.Graph(), config=sess_config)
         loader.load(self.tf_session, [tag_set], savedmodel_path)
@@ -496,35 +492,78 @@ class TritonPythonModel:
           be the same as `requests`
         """
 
-        responses = []
+        # A single request is fed as is, stacking it would only copy its inputs.
+        if self.batching_enabled and len(requests) > 1:
+            return self._execute_batch(requests)
+
+        get_input = pb_utils.get_input_tensor_by_name
+        input_feed_dict = self.input_feed_dict
+        feed_names = self.feed_names
 
-        # FIXME: Instead of iterating through each request, run
-        # the inference as a single batch.
+        responses = []
         for request in requests:
             # Prepare the input feed for the model.
-            for input_name in self.input_names:
-                self.input_feed_dict[
-                    self.input_tensor_info[input_name].name
-                ] = pb_utils.get_input_tensor_by_name(request, input_name).as_numpy()
+            for input_name, tensor_name in feed_names:
+                input_feed_dict[tensor_name] = get_input(request, input_name).as_numpy()
 
             # FIXME: Add GPU Tensor handling. DLpack should be utilized
             # for better performance
             outputs = self.tf_session.run(
-                self.output_tensor_names, feed_dict=self.input_feed_dict
+                self.output_tensor_names, feed_dict=input_feed_dict
             )
+            responses.append(self._create_response(outputs))
 
-            # Create output tensors. You need pb_utils.Tensor
-            # objects to create pb_utils.InferenceResponse.
-            output_tensors = []
-            for i, output in enumerate(outputs):
-                output_tensors.append(pb_utils.Tensor(self.output_names[i], output))
+        return responses
 
-            inference_response = pb_utils.InferenceResponse(
-                output_tensors=output_tensors
-            )
-            responses.append(inference_response)
+    def _execute_batch(self, requests):
+        # Gather the inputs of all the requests and run the inference as a
+        # single batch.
+        get_input = pb_utils.get_input_tensor_by_name
+        input_names = self.input_names
+        requests_inputs = [
+            [get_input(request, input_name).as_numpy() for input_name in input_names]
+            for request in requests
+        ]
+        sections = [request_inputs[0].shape[0] for request_inputs in requests_inputs]
 
-        return responses
+        for tensor_name, inputs in zip(self.input_tensor_names, zip(*requests_inputs)):
+            self.input_feed_dict[tensor_name] = np.concatenate(inputs, axis=0)
+
+        outputs = self.tf_session.run(
+            self.output_tensor_names, feed_dict=self.input_feed_dict
+        )
+
+        # The model must return one row per input row for the outputs to be
+        # split back, np.split would otherwise silently truncate them.
+        batch_size = sum(sections)
+        for output_name, output in zip(self.output_names, outputs):
+            if np.ndim(output) == 0 or output.shape[0] != batch_size:
+                raise pb_utils.TritonModelException(
+                    f"Unable to split batched output tensor '"
+                    + output_name
+                    + "', expected first dimension of "
+                    + str(batch_size)
+                    + ", got shape "
+                    + str(np.shape(output))
+                )
+
+        # Split the batched outputs back into the outputs of each request.
+        split_indices = np.cumsum(sections)[:-1]
+        splits = [np.split(output, split_indices) for output in outputs]
+
+        return [
+            self._create_response(request_outputs) for request_outputs in zip(*splits)
+        ]
+
+    def _create_response(self, outputs):
+        # Create output tensors. You need pb_utils.Tensor
+        # objects to create pb_utils.InferenceResponse.
+        return pb_utils.InferenceResponse(
+            output_tensors=[
+                pb_utils.Tensor(output_name, output)
+                for output_name, output in zip(self.output_names, outputs)
+            ]
+        )
 
     def finalize(self):
         """`finalize` is called only once when the model is being unloaded.